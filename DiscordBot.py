@@ -3,29 +3,84 @@ import os
 from discord.ext import commands
 from discord.ui import View, TextInput, Select
 from dotenv import load_dotenv
+import asyncio
 import DiscordDB
-import random
-import datetime
-import PaginationView
+import LiveEvents
+import QueryProfiler
+import ShardIPC
 
 # environment variables
 load_dotenv()
 TOKEN = os.getenv('DISCORD_TOKEN')
 
+# Set by Launcher.py when the bot runs as several processes
+SHARD_COUNT = int(os.getenv('SHARD_COUNT')) if os.getenv('SHARD_COUNT') else None
+SHARD_IDS = [int(shard) for shard in os.getenv('SHARD_IDS').split(',')] if os.getenv('SHARD_IDS') else None
+IPC_PORT = int(os.getenv('IPC_PORT')) if os.getenv('IPC_PORT') else None
+IPC_PEERS = [int(port) for port in os.getenv('IPC_PEERS').split(',')] if os.getenv('IPC_PEERS') else []
+
+# Set to a number of milliseconds to profile database statements and log the ones slower than that
+DB_PROFILE_MS = os.getenv('DB_PROFILE_MS')
+
+# Most statements !dbprofile lists, the output is split into several messages as needed
+MAX_PROFILE_STATEMENTS = 50
+
 intents = discord.Intents.default()
 intents.members = True  # Disable typing events, if needed
 intents.presences = True  # Disable presence events, if needed
 intents.message_content = True    # Enable message content updates (required for commands)
 
+# Command modules loaded when the bot starts
+EXTENSIONS = ['cogs.Points', 'cogs.Betting']
+
+# Rarely used command modules, loaded the first time one of their commands is invoked
+LAZY_EXTENSIONS = {
+    'create_challenge': 'cogs.Challenges',
+    'challenges': 'cogs.Challenges',
+    'completed': 'cogs.Challenges',
+    'complete': 'cogs.Challenges',
+    '50/50': 'cogs.Gambling',
+    'export': 'cogs.Backup',
+    'import': 'cogs.Backup',
+    'snapshot': 'cogs.Backup',
+}
+
 class CustomHelpCommand(commands.DefaultHelpCommand):
+    # Rendered embeds keyed by the loaded cogs and their commands.
+    # Kept on the class because the help command is copied for every invocation.
+    embed_cache = {}
+
+    async def prepare_help_command(self, ctx, command=None):
+        # Help for a lazy command loads its module, so the command and its help text can be found
+        extension = LAZY_EXTENSIONS.get(command)
+        if extension:
+            await ctx.bot.load_lazy_extension(extension)
+        await super().prepare_help_command(ctx, command)
+
     async def send_bot_help(self, mapping):
-        embed = discord.Embed(title="Friend Bot's Commands", color=discord.Color.blue())
+        # Lazy modules that aren't loaded yet are listed by command name only
+        unloaded = {}
+        for command_name, extension in LAZY_EXTENSIONS.items():
+            if extension not in self.context.bot.extensions:
+                unloaded.setdefault(extension.split('.')[-1], []).append(command_name)
+
+        key = (tuple((cog.qualified_name if cog else None, tuple(command.name for command in commands)) for cog, commands in mapping.items()),
+               tuple((module, tuple(names)) for module, names in unloaded.items()))
+        embed = CustomHelpCommand.embed_cache.get(key)
+
+        if embed is None:
+            embed = discord.Embed(title="Friend Bot's Commands", color=discord.Color.blue())
+
+            for cog, commands in mapping.items():
+                if cog:
+                    embed.add_field(name=cog.qualified_name, value=" ".join(f"`{command.name}\n`" for command in commands), inline=False)
+                else:
+                    embed.add_field(name="Commands", value=" ".join(f"`{command.name}\n`" for command in commands), inline=False)
+
+            for module, names in unloaded.items():
+                embed.add_field(name=module, value=" ".join(f"`{name}\n`" for name in names), inline=False)
 
-        for cog, commands in mapping.items():
-            if cog:
-                embed.add_field(name=cog.qualified_name, value=" ".join(f"`{command.name}\n`" for command in commands), inline=False)
-            else:
-                embed.add_field(name="Commands", value=" ".join(f"`{command.name}\n`" for command in commands), inline=False)
+            CustomHelpCommand.embed_cache[key] = embed
 
         channel = self.get_destination()
         await channel.send(embed=embed)
@@ -35,306 +90,91 @@ class CustomHelpCommand(commands.DefaultHelpCommand):
         channel = self.get_destination()
         await channel.send(embed=embed)
 
-bot = commands.Bot(command_prefix='!', help_command=CustomHelpCommand(), intents=intents)
-db = DiscordDB.DiscordDatabase()
-
-@bot.event
-async def on_ready():
-    db.create_tables()
-
-# ================================= Points  ==================================== #
-@bot.command(name='points', help="!points \nShow your current points")
-async def check_points(ctx):
-    # Check and display user points
-    user_id = str(ctx.author.id)
-    points = db.get_user_points(user_id)
-    await ctx.send(f"{ctx.author.mention}, you have {points} points.")
-
-@bot.command(name='leaderboard', help="!leaderboard \nShow the top 20 players with the most points")
-async def leaderboard(ctx):
-    # Display the top 10 players on the leaderboard
-    sorted_users = db.get_top_users()
-    leaderboard_message = "Leaderboard:\n"
-    for idx, (user_id, points) in enumerate(sorted_users, start=1):
-        member = ctx.guild.get_member(int(user_id))
-        username = member.name if member else f"User not found ({user_id})"
-        leaderboard_message += f"{idx}. {username}: {points} points\n"
-
-    await ctx.send(leaderboard_message)
-
-# ================================= Challenges ==================================== #
-@bot.command(name='create_challenge', help="!create_challenge {name} {points} {unique?} \nCreates a challenge ")
-async def add_challenge(ctx, name, points, unique_challenge=True):
-    try:
-        points = int(points)
-        if points < 0:
-            raise ValueError("Points should be a non-negative integer.")
-
-        # Add the challenge to the database
-        db.add_challenge(name, points, unique_challenge)
-
-        await ctx.send(f"Challenge '{name}' with {points} points added successfully.")
-    except ValueError as ve:
-        await ctx.send(f"Error: {ve}")
-    except Exception as e:
-        await ctx.send(f"An error occurred: {e}")
-
-@bot.command(name='challenges', help="!challenges \nLists all the challenges")
-async def list_challenges(ctx):
-    try:
-        # Retrieve challenges from the database
-        challenges_list = db.get_challenges()
-
-        # Display challenges in a formatted way
-        if challenges_list:
-            challenge_str = "Challenges:\n"
-            for challenge in challenges_list:
-                challenge_str += f"ID: {challenge[0]}: {challenge[2]} points - {challenge[1]}\n"
-            await ctx.send(challenge_str)
-        else:
-            await ctx.send("No challenges found in the database.")
-    except Exception as e:
-        await ctx.send(f"An error occurred: {e}")
-
-@bot.command(name='completed', help="!completed \nGet a list of completed challenges and who completed them")
-async def completed_challenges(ctx):
-    try:
-        # Retrieve completed challenges from the database
-        completed_challenges_list = db.get_completed_challenges()
-
-        # Display completed challenges in a formatted way
-        if completed_challenges_list:
-            completed_str = "Completed Challenges:\n"
-            for completion in completed_challenges_list:
-                user_id, challenge_id, completion_count = completion
-                challenge_info = db.get_challenge_info(challenge_id)  # Assuming there is a method to get challenge info by ID
-                if challenge_info:
-                    completed_str += (f"Challenge: {challenge_info['name']}, "
-                                      f"User: <@{user_id}>, "
-                                      f"Completion Count: {completion_count}\n")
-                else:
-                    completed_str += f"Challenge ID {challenge_id}, User: <@{user_id}>, Completion Count: {completion_count}\n"
-            await ctx.send(completed_str)
-        else:
-            await ctx.send("No completed challenges found in the database.")
-    except Exception as e:
-        await ctx.send(f"An error occurred: {e}")
-
-# Command to complete a challenge for a user
-@bot.command(name='complete', help="!complete {user_mention} {challenge_ID} \nCompletes the challenge and reward the mentioned user points")
-async def complete_challenge(ctx, user_mention, challenge_id):
-    try:
-        # Check if the command user is the server owner
-        if ctx.author.id != ctx.guild.owner_id:
-            await ctx.send("Only the server owner can use this command.")
-            return
-
-        # Parse the user mention to get the user ID
-        user_id = int(user_mention.strip('<@!>').replace('>', ''))
-
-        # Complete the challenge for the user
-        db.complete_challenge(user_id, challenge_id)
-
-        # Retrieve the user's total points after completing the challenge
-        user_points = db.get_user_points(user_id)
-
-        await ctx.send(f"Challenge with ID {challenge_id} completed for user <@{user_id}>. "
-                       f"They now have {user_points} points.")
-    except ValueError:
-        await ctx.send("Invalid user mention or challenge ID.")
-    except Exception as e:
-        await ctx.send(f"An error occurred: {e}")
-
-# ================================= Betting ==================================== #
-# Command to create a new betting event
-@bot.command(name='create_event', help="!create_event {team1} {team2} {odds1} {odds2} {year-month-day_00:00:00} \nCreates a betting event of two teams with their odds and the betting period starting now")
-async def create_event(ctx, team1, team2, odds1, odds2, match_time):
-    try:
-        guild_id = ctx.guild.id
-        odds1 = float(odds1)
-        odds2 = float(odds2)
-        match_time = datetime.datetime.strptime(match_time, "%Y-%m-%d_%H:%M:%S")
-        print(match_time)
+class FriendsBot(commands.AutoShardedBot):
+    def __init__(self, db, **kwargs):
+        super().__init__(**kwargs)
+        # Shared database, injected into every cog in its setup function
+        self.db = db
+        self.lazy_load_lock = asyncio.Lock()
 
-        # Calculate the end time of the betting period
-        betting_end_time = match_time
+        # Posted !events messages that follow new bets
+        self.live_updater = LiveEvents.LiveEventUpdater(db)
 
-        # Create the event in the database
-        event_id = db.create_event(guild_id, team1, team2, odds1, odds2, betting_end_time)
+    async def setup_hook(self):
+        # Keep caches in sync with the other shard processes
+        if IPC_PORT:
+            await ShardIPC.CacheInvalidator(self.db, IPC_PORT, IPC_PEERS).start()
 
-        # Convert betting_end_time to Unix timestamp
-        unix_timestamp = int(betting_end_time.timestamp())
+        for extension in EXTENSIONS:
+            await self.load_extension(extension)
 
-        await ctx.send(f"Event ID: {event_id} created successfully! Betting duration ends at: <t:{unix_timestamp}:f> or <t:{unix_timestamp}:R>")
-    except ValueError:
-        await ctx.send("Invalid odds or duration. Please provide valid numbers.")
-    except Exception as e:
-        await ctx.send(f"An error occurred: {e}")
+    async def get_context(self, origin, *, cls=commands.Context):
+        ctx = await super().get_context(origin, cls=cls)
 
-# Command to place a bet
-@bot.command(name='bet', help="!bet {eventID} {chosen_team} {amount} \nBet on a team with your money and pray that you win")
-async def bet(ctx, event_id, chosen_team, amount):
-    try:        
-        user_id = ctx.author.id
-        guild_id = ctx.guild.id
-        event_id = int(event_id)
-        amount = int(amount)
-
-        # Check if the event is still active in the database
-        print("Checking if event is still active")
-        if not db.is_event_active(guild_id, event_id):
-            await ctx.send("Invalid event ID. Make sure the event is still active.")
-            return
+        # Load a lazy command module on first use, then resolve the command again
+        extension = LAZY_EXTENSIONS.get(ctx.invoked_with)
+        if ctx.command is None and extension:
+            await self.load_lazy_extension(extension)
+            ctx = await super().get_context(origin, cls=cls)
 
-        # Check if the chosen team is valid
-        print("check if the team is valid")
-        if not db.is_valid_team(guild_id, event_id, chosen_team):
-            await ctx.send("Invalid team. Choose a team from the active events.")
-            return
+        return ctx
 
-        # Check if the user has enough points to place the bet
-        print('Getting user points')
-        user_points = db.get_user_points(user_id)
-        if amount > user_points:
-            await ctx.send("You don't have enough points to place that bet.")
+    async def load_lazy_extension(self, extension):
+        async with self.lazy_load_lock:
+            if extension not in self.extensions:
+                print(f"Lazy loading {extension}")
+                await self.load_extension(extension)
 
-        # Check if the betting period has ended
-        print("Check if betting period is over")
-        if datetime.datetime.now() > db.get_betting_end_time(guild_id, event_id):
-            await ctx.send("Betting period has ended.")
-            return
-
-        # Place the bet in the database
-        print("placing bet")
-        db.place_bet(guild_id, event_id, user_id, chosen_team, amount)
-
-        # Deduct points from the user's wallet
-        print("updating user wallet")
-        db.update_user_points(user_id, -amount)
+db = DiscordDB.DiscordDatabase()
+if DB_PROFILE_MS:
+    db.profiler = QueryProfiler.QueryProfiler(float(DB_PROFILE_MS))
+bot = FriendsBot(db, command_prefix='!', help_command=CustomHelpCommand(), intents=intents, shard_count=SHARD_COUNT, shard_ids=SHARD_IDS)
 
-        await ctx.send(f"Bet placed! You bet {amount} points on {chosen_team}. Good luck!")
-    except ValueError:
-        await ctx.send("Invalid event ID or amount. Please provide valid integers.")
-    except Exception as e:
-        await ctx.send(f"An error occurred: {e}")
+@bot.event
+async def on_ready():
+    db.create_tables()
 
-# Command to end a betting event and declare the winner 
-@bot.command(name='end_event', help="!end_event {event_id} {winning_team} \nEnd the event and specify who won. Payouts will be given")
-async def end_event(ctx, event_id, winner_team):
+# ================================= Admin ==================================== #
+# Reload a command module in place so fixes go live without dropping the gateway session
+@bot.command(name='reload', help="!reload {module} \nReloads a command module (Points, Challenges, Betting, Gambling, Backup) without restarting the bot")
+@commands.is_owner()
+async def reload(ctx, module):
+    extension = f"cogs.{module}"
     try:
-        user_id = ctx.author.id
-        guild_id = ctx.guild.id
-        event_id = int(event_id)
-
-        # Check if the event is still active in the database
-        print("checking event active")
-        if not db.is_event_active(guild_id, event_id):
-            await ctx.send("Invalid event ID. Make sure the event is still active.")
-            return
-
-        # Check if the event has already been ended
-        print("check if event ended")
-        if db.is_event_ended(guild_id, event_id):
-            await ctx.send("This event has already been ended.")
-            return
-        
-        # Validate that the winning team exists in the event (you need to implement this function)
-        print("check if team is valid")
-        if not db.is_valid_team(guild_id, event_id, winner_team):
-            await ctx.send(f"The specified winning team '{winner_team}' does not exist in the event.")
-            return
-
-        # Set the winner and calculate payouts
-        print("calculate payout")
-        winning_odds, winning_bets = db.calculate_payouts(guild_id, event_id, winner_team)
-        print(winning_bets)
-
-        # Update user points in the database
-        for user_id, amount in winning_bets.items():
-            print(str(user_id) + "bet this much: " + str(amount))
-            payout = int(amount * winning_odds)
-            db.update_user_points(user_id, payout + amount)
-            await ctx.send(f"{ctx.guild.get_member(user_id).mention} You won {payout} points! Congratulations!")
-
-        # Mark the event as ended in the database
-        db.mark_event_as_ended(guild_id, event_id, winner_team)
-
-        await ctx.send(f"The winner is {winner_team}! Payouts have been processed.")
-    except ValueError:
-        await ctx.send("Invalid event ID. Please provide a valid integer.")
-    except Exception as e:
+        if extension in bot.extensions:
+            await bot.reload_extension(extension)
+        else:
+            await bot.load_extension(extension)
+        await ctx.send(f"Module {module} reloaded.")
+    except commands.ExtensionError as e:
         await ctx.send(f"An error occurred: {e}")
 
-# Command to display a list of events with user bets
-@bot.command(name='events', help="!events \nGet a list of betting events currently happening")
-async def list_events(ctx):
+@bot.command(name='dbprofile', help="!dbprofile {count} \nShow the database statements that took the most total time")
+@commands.is_owner()
+async def dbprofile(ctx, count=10):
     try:
-        guild_id = ctx.guild.id
-
-        # Retrieve the list of active events from the database
-        active_events = db.get_active_events(guild_id)
-
-        # Check if there are any active events
-        if not active_events:
-            await ctx.send("No active events available.")
+        if not db.profiler:
+            await ctx.send("Profiling is off. Start the bot with DB_PROFILE_MS set to turn it on.")
             return
-        
-        # Format and send the list of active events in a Discord message
-        event_list = []
-        for event in active_events:
-            event_id, team1, team2, odds1, odds2, betting_end_time = event
-            unix_timestamp  = int(datetime.datetime.strptime(betting_end_time, "%Y-%m-%d %H:%M:%S").timestamp())
-
-            # Retrieve user bets for each team from the database
-            team1_bets = db.get_bets_for_team(guild_id, event_id, team1)
-            team2_bets = db.get_bets_for_team(guild_id, event_id, team2)
-
-            # Convert user IDs to usernames
-            team1_bets_with_usernames = [(ctx.guild.get_member(user_id).name, amount) for user_id, amount in team1_bets]
-            team2_bets_with_usernames = [(ctx.guild.get_member(user_id).name, amount) for user_id, amount in team2_bets]
-            user_balance = db.get_user_points(ctx.author.id)
-            event_list.append({
-                "event_id": event_id,
-                "team1": team1,
-                "team2": team2,
-                "odds1": odds1,
-                "odds2": odds2,
-                "unix_timestamp": unix_timestamp,
-                "team1_bets_with_usernames" : team1_bets_with_usernames,
-                "team2_bets_with_usernames": team2_bets_with_usernames,
-                "user_balance": user_balance
-            })
-        pagination_view = PaginationView.PaginationView()
-        pagination_view.data = event_list
-        await pagination_view.send(ctx)
-    except Exception as e:
-        await ctx.send(f"An error occurred: {e}")
 
-# ================================= Gambling =================================== #
-@bot.command(name='50/50', help="!50/50 \nYou have a 50/50 chance of doubling the amount you invest")
-async def fifty_fifty(ctx, amount):
-    try:
-        user_id = ctx.author.id
-        amount = int(amount)
-
-        # Check if the user has enough points to place the bet
-        user_points = db.get_user_points(user_id)
-        if amount > user_points:
-            await ctx.send("You don't have enough points to place that bet.")
+        top_statements = db.profiler.top(min(int(count), MAX_PROFILE_STATEMENTS))
+        if not top_statements:
+            await ctx.send("No statements recorded yet.")
             return
 
-        # Simulate a bet outcome (you can replace this with your own logic)
-        win = random.choice([True, False])
-
-        # Update user points based on the bet outcome
-        if win:
-            db.update_user_points(user_id, amount)
-            await ctx.send(f"Congratulations! You won {amount} points. Your total points: {user_points + amount}")
-        else:
-            db.update_user_points(user_id, -amount)
-            await ctx.send(f"Oops! You lost {amount} points. Your total points: {user_points - amount}")
+        # Split into several messages to stay under Discord's 2000 character limit
+        header = "```\ntotal ms | calls | max ms | rows | statement\n"
+        profile_message = header
+        for statement, calls, total, slowest, rows in top_statements:
+            line = f"{total * 1000:8.1f} | {calls:5} | {slowest * 1000:6.1f} | {rows:4} | {statement[:80]}\n"
+            if len(profile_message) + len(line) + len("```") > 2000:
+                await ctx.send(profile_message + "```")
+                profile_message = header
+            profile_message += line
+
+        await ctx.send(profile_message + "```")
     except ValueError:
-        await ctx.send("Invalid bet amount. Please provide a positive integer.")
+        await ctx.send("Invalid count. Please provide a valid integer.")
     except Exception as e:
         await ctx.send(f"An error occurred: {e}")
 
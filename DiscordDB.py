@@ -1,24 +1,147 @@
 import sqlite3
 import datetime
+import json
+import time
+from array import array
+import QueryProfiler
+
+# Seconds a connection waits on a lock held by another shard process before giving up.
+# Database calls run on the event loop, so this stays short to keep gateway heartbeats going.
+BUSY_TIMEOUT = 0.25
+
+# BEGIN IMMEDIATE is retried this many times, waiting twice as long after each failure
+LOCK_RETRIES = 4
+LOCK_RETRY_DELAY = 0.05
+
+# Rows read per fetchmany when streaming large results
+FETCH_CHUNK = 1000
+
+# Results of DiscordDatabase.place_bet
+BET_PLACED = 'placed'
+BET_NOT_ENOUGH_POINTS = 'not_enough_points'
+BET_OTHER_TEAM = 'other_team'
+BET_NOT_FOUND = 'not_found'
+
+def read_bet_columns(cursor):
+    # Streams (user_id, amount) rows into two parallel arrays of 64-bit ints,
+    # 16 bytes a bet instead of a tuple and two int objects per row
+    user_ids = array('q')
+    amounts = array('q')
+    rows = cursor.fetchmany(FETCH_CHUNK)
+    while rows:
+        user_ids.extend(row[0] for row in rows)
+        amounts.extend(row[1] for row in rows)
+        rows = cursor.fetchmany(FETCH_CHUNK)
+    return user_ids, amounts
+
+def calculate_winnings(amounts, odds):
+    # Winnings for every bet at once, rounded down to whole points
+    return array('q', map(int, map(odds.__mul__, amounts)))
 
 class DiscordDatabase:
     def __init__(self, db_name='discord.db'):
         self.db_name = db_name
         self.conn = None
         self.cursor = None
+
+        # Cached balances (user_id -> points) and active events (guild_id -> rows)
+        self.points_cache = {}
+        self.events_cache = {}
+
+        # Running bet totals per event ((guild_id, event_id) -> [team1_total, team2_total])
+        self.pool_cache = {}
+
+        # Bumped whenever an event or its bets change ((guild_id, event_id) -> version)
+        self.event_versions = {}
+
+        # Called with (guild_id, event_id) whenever an event's version is bumped
+        self.event_listeners = []
+
+        # Called with (guild_id, event_id) once an event has ended, after its version is bumped
+        self.event_end_listeners = []
+
+        # Called with (kind, key) after a local write so other shard processes can drop their copy
+        self.on_invalidate = None
+
+        # Set to a QueryProfiler to time every statement
+        self.profiler = None
     
-    def connect(self):
-        self.conn = sqlite3.connect(self.db_name)
-        self.cursor = self.conn.cursor()
+    def connect(self, immediate=False):
+        # Autocommit mode, so single statements are atomic on their own and transactions are explicit
+        if self.profiler:
+            start = time.perf_counter()
+            self.conn = sqlite3.connect(self.db_name, timeout=BUSY_TIMEOUT, isolation_level=None)
+            self.profiler.record('(connect)', time.perf_counter() - start)
+            self.cursor = self.conn.cursor(QueryProfiler.ProfilingCursor)
+            self.cursor.profiler = self.profiler
+        else:
+            self.conn = sqlite3.connect(self.db_name, timeout=BUSY_TIMEOUT, isolation_level=None)
+            self.cursor = self.conn.cursor()
+
+        # Read-modify-write operations take the write lock up front, so a concurrent
+        # writer waits for it instead of failing on a lock upgrade
+        if immediate:
+            self.begin_immediate()
+
+    def begin_immediate(self):
+        # At most about 1.4 seconds in total before "database is locked" reaches the command
+        for attempt in range(LOCK_RETRIES):
+            try:
+                self.cursor.execute('BEGIN IMMEDIATE')
+                return
+            except sqlite3.OperationalError as e:
+                if 'locked' not in str(e) or attempt == LOCK_RETRIES - 1:
+                    self.conn.close()
+                    raise
+                time.sleep(LOCK_RETRY_DELAY * 2 ** attempt)
 
     def close(self):
         if self.conn:
-            self.conn.commit()
+            # On write paths the commit (and its fsync) is usually the biggest cost
+            if self.profiler:
+                start = time.perf_counter()
+                self.conn.commit()
+                self.profiler.record('(commit)', time.perf_counter() - start)
+            else:
+                self.conn.commit()
             self.conn.close()
 
+    def invalidate(self, kind, key, publish=True):
+        # A key of None drops everything of that kind
+        if key is None:
+            {'points': self.points_cache, 'events': self.events_cache, 'pools': self.pool_cache}[kind].clear()
+        elif kind == 'points':
+            self.points_cache.pop(key, None)
+        elif kind == 'events':
+            self.events_cache.pop(key, None)
+        elif kind == 'pools':
+            self.pool_cache.pop(tuple(key), None)
+            self.bump_event_version(*key)
+        elif kind == 'ended':
+            self.bump_event_version(*key)
+            for listener in self.event_end_listeners:
+                listener(*key)
+
+        if publish and self.on_invalidate:
+            self.on_invalidate(kind, key)
+
+    def bump_event_version(self, guild_id, event_id):
+        self.event_versions[(guild_id, event_id)] = self.event_versions.get((guild_id, event_id), 0) + 1
+        for listener in self.event_listeners:
+            listener(guild_id, event_id)
+
+    def get_event_version(self, guild_id, event_id):
+        return self.event_versions.get((guild_id, event_id), 0)
+
     def create_tables(self):
         self.connect()
 
+        # WAL lets readers in every shard process run alongside the single writer
+        self.cursor.execute('PRAGMA journal_mode=WAL')
+
+        # Every shard process runs this on startup, the lock keeps the migrations below from racing
+        self.begin_immediate()
+
         # Create challenges table
         self.cursor.execute('''
             CREATE TABLE IF NOT EXISTS challenges (
@@ -60,11 +183,29 @@ class DiscordDatabase:
                 odds2 REAL,
                 winner TEXT,
                 betting_end_time TEXT,
+                parimutuel BOOLEAN DEFAULT 0,
                 FOREIGN KEY (guild_id) REFERENCES user_points (user_id)
             )
         ''')
 
-        # Create the bets table (formerly user_bets)
+        # Add the parimutuel column to databases created before it existed
+        self.cursor.execute('PRAGMA table_info(betting_events)')
+        if 'parimutuel' not in [column[1] for column in self.cursor.fetchall()]:
+            self.cursor.execute('ALTER TABLE betting_events ADD COLUMN parimutuel BOOLEAN DEFAULT 0')
+
+        # Create the event_pools table, the running total bet on each team of an event
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS event_pools (
+                guild_id INTEGER,
+                event_id INTEGER,
+                team1_total INTEGER DEFAULT 0,
+                team2_total INTEGER DEFAULT 0,
+                PRIMARY KEY (guild_id, event_id),
+                FOREIGN KEY (guild_id, event_id) REFERENCES betting_events (guild_id, event_id)
+            )
+        ''')
+
+        # Create the bets table (formerly user_bets), one row holding each user's current position on an event
         self.cursor.execute('''
             CREATE TABLE IF NOT EXISTS bets (
                 guild_id INTEGER,
@@ -77,10 +218,47 @@ class DiscordDatabase:
                 FOREIGN KEY (user_id) REFERENCES user_points (user_id)
             )
         ''')
+
+        # Create the daily_claims table, who claimed their daily points on which day (date ordinal)
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS daily_claims (
+                day INTEGER,
+                user_id INTEGER,
+                PRIMARY KEY (day, user_id)
+            ) WITHOUT ROWID
+        ''')
+
+        # Create the daily_stipends table, who was paid the stipend on which day (date ordinal)
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS daily_stipends (
+                day INTEGER,
+                user_id INTEGER,
+                PRIMARY KEY (day, user_id)
+            ) WITHOUT ROWID
+        ''')
+
+        # Create the bet_log table, every change made to a position
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS bet_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER,
+                event_id INTEGER,
+                user_id INTEGER,
+                chosen_team TEXT,
+                amount INTEGER,
+                placed_at TEXT,
+                FOREIGN KEY (guild_id, event_id) REFERENCES betting_events (guild_id, event_id),
+                FOREIGN KEY (user_id) REFERENCES user_points (user_id)
+            )
+        ''')
         
         self.close()
 
     def get_user_points(self, user_id):
+        user_id = int(user_id)
+        if user_id in self.points_cache:
+            return self.points_cache[user_id]
+
         self.connect()
 
         # Check if the user exists in the user_points table
@@ -89,13 +267,16 @@ class DiscordDatabase:
 
         # If the user doesn't exist, create a new user entry with points initialized to 0
         if not user_points:
-            self.cursor.execute('INSERT INTO user_points (user_id, points) VALUES (?, ?)', (user_id, 100))
+            # Another process may create the same user at the same time
+            self.cursor.execute('INSERT OR IGNORE INTO user_points (user_id, points) VALUES (?, ?)', (user_id, 100))
+            self.cursor.execute('SELECT points FROM user_points WHERE user_id = ?', (user_id,))
+            user_points = self.cursor.fetchone()
             print(f"User with ID {user_id} created in user_points table with 100 points.")
-            user_points = (100,)  # Set user_points to (0,) to avoid NoneType issues
 
         # Close the connection
         self.close()
 
+        self.points_cache[user_id] = user_points[0]
         return user_points[0]  # Return points as a single value
 
     def add_user_points(self, user_id, challenge_id):
@@ -108,21 +289,95 @@ class DiscordDatabase:
         self.close()
 
     def update_user_points(self, user_id, points_change):
-        # Retrieve the current points of the user
-        current_points = self.get_user_points(user_id)
+        user_id = int(user_id)
+        self.connect(immediate=True)
 
-        self.connect()
-        # Calculate the new points after the change
-        new_points = max(0, current_points + points_change)  # Ensure the user cannot have negative points
+        # Make sure the user exists with the starting balance
+        self.cursor.execute('INSERT OR IGNORE INTO user_points (user_id, points) VALUES (?, ?)', (user_id, 100))
 
-        # Update the user's points in the user_points table
+        # Apply the change in SQL so concurrent writers never overwrite each other's updates
         self.cursor.execute('''
-            REPLACE INTO user_points (user_id, points)
-            VALUES (?, ?)
-        ''', (user_id, new_points))
+            UPDATE user_points
+            SET points = MAX(0, points + ?)
+            WHERE user_id = ?
+        ''', (points_change, user_id))  # Ensure the user cannot have negative points
 
         # Commit the changes and close the connection
         self.close()
+        self.invalidate('points', user_id)
+
+    def claim_daily(self, user_id, day, amount):
+        # Returns False if the user already claimed on that day
+        user_id = int(user_id)
+        self.connect(immediate=True)
+
+        # Make sure the user exists with the starting balance
+        self.cursor.execute('INSERT OR IGNORE INTO user_points (user_id, points) VALUES (?, ?)', (user_id, 100))
+
+        # The primary key rejects a second claim, even from another shard process
+        self.cursor.execute('INSERT OR IGNORE INTO daily_claims (day, user_id) VALUES (?, ?)', (day, user_id))
+        if self.cursor.rowcount == 0:
+            self.close()
+            return False
+
+        self.cursor.execute('UPDATE user_points SET points = points + ? WHERE user_id = ?', (amount, user_id))
+
+        self.close()
+        self.invalidate('points', user_id)
+        return True
+
+    def get_daily_claims(self, day):
+        self.connect()
+
+        # Retrieve everyone who claimed on that day
+        self.cursor.execute('SELECT user_id FROM daily_claims WHERE day = ?', (day,))
+        claimed = {user_id for (user_id,) in self.cursor.fetchall()}
+
+        # Close the connection
+        self.close()
+
+        return claimed
+
+    def prune_daily_claims(self, before_day):
+        self.connect()
+
+        # Only the current day's claims are needed
+        self.cursor.execute('DELETE FROM daily_claims WHERE day < ?', (before_day,))
+
+        self.close()
+
+    def grant_stipend(self, user_ids, day, amount):
+        # Gives amount to every listed user that already has points and wasn't paid on that day.
+        # Every shard process runs the stipend, the daily_stipends rows keep it to one payment.
+        self.connect(immediate=True)
+
+        # Only the current day's payments are needed
+        self.cursor.execute('DELETE FROM daily_stipends WHERE day < ?', (day,))
+
+        # Users not paid yet, read under the write lock so no other process pays them meanwhile
+        self.cursor.execute('''
+            SELECT value
+            FROM json_each(?)
+            WHERE value NOT IN (SELECT user_id FROM daily_stipends WHERE day = ?)
+        ''', (json.dumps([int(user_id) for user_id in user_ids]), day))
+        unpaid = json.dumps([user_id for (user_id,) in self.cursor.fetchall()])
+
+        self.cursor.execute('''
+            INSERT INTO daily_stipends (day, user_id)
+            SELECT ?, value FROM json_each(?)
+        ''', (day, unpaid))
+
+        self.cursor.execute('''
+            UPDATE user_points
+            SET points = points + ?
+            WHERE user_id IN (SELECT value FROM json_each(?))
+        ''', (amount, unpaid))
+
+        granted = self.cursor.rowcount
+
+        self.close()
+        self.invalidate('points', None)
+        return granted
 
     def get_top_users(self, limit=20):
         self.connect()
@@ -198,7 +453,7 @@ class DiscordDatabase:
             return None
 
     def complete_challenge(self, user_id, challenge_id):
-        self.connect()
+        self.connect(immediate=True)
         try:
             # Check if the challenge is unique or can be completed multiple times
             self.cursor.execute('SELECT unique_challenge FROM challenges WHERE id = ?', (challenge_id,))
@@ -220,37 +475,157 @@ class DiscordDatabase:
             print(f"Error completing challenge: {e}")
         finally:
             self.close()
+            self.invalidate('points', int(user_id))
 
     # BETTING AND EVENTS #
     
-    def create_event(self, guild_id, team1, team2, odds1, odds2, betting_end_time):
-        self.connect()
+    def create_event(self, guild_id, team1, team2, odds1, odds2, betting_end_time, parimutuel=False):
+        self.connect(immediate=True)
 
         # Insert the new event into the betting_events table
+        # Parimutuel events ignore the fixed odds and pay out from the live pool instead
         self.cursor.execute('''
-            INSERT INTO betting_events (guild_id, team1, team2, odds1, odds2, winner, betting_end_time)
-            VALUES (?, ?, ?, ?, ?, NULL, ?)
-        ''', (guild_id, team1, team2, odds1, odds2, betting_end_time))
+            INSERT INTO betting_events (guild_id, team1, team2, odds1, odds2, winner, betting_end_time, parimutuel)
+            VALUES (?, ?, ?, ?, ?, NULL, ?, ?)
+        ''', (guild_id, team1, team2, odds1, odds2, betting_end_time, parimutuel))
 
         # Get the last inserted row ID, which is the auto-incremented event_id
         event_id = self.cursor.lastrowid
 
+        # Start the event with an empty pool
+        self.cursor.execute('INSERT INTO event_pools (guild_id, event_id) VALUES (?, ?)', (guild_id, event_id))
+
         # Commit the changes and close the connection
         self.close()
+        self.invalidate('events', guild_id)
 
         return event_id
 
-    def place_bet(self, guild_id, event_id, user_id, team, amount):
+    def place_bet(self, guild_id, event_id, user_id, team, amount, replace=False):
+        # Adds amount to the user's position on team, or sets the position to amount on team when replace is True.
+        # Returns (result, team, amount): the new position when the bet is placed, the existing
+        # position when adding to a bet on the other team, otherwise nothing is changed.
+        self.connect(immediate=True)
+
+        # Retrieve the user's current position on the event
+        self.cursor.execute('''
+            SELECT chosen_team, amount
+            FROM bets
+            WHERE guild_id = ? AND event_id = ? AND user_id = ?
+        ''', (guild_id, event_id, user_id))
+
+        position = self.cursor.fetchone()
+        old_team, old_amount = position or (team, 0)
+        same_team = old_team.lower() == team.lower()
+
+        # Checked inside the transaction so a concurrent !change_bet can't turn this into a switch
+        if not replace and not same_team:
+            self.close()
+            return BET_OTHER_TEAM, old_team, old_amount
+
+        # Nothing to cancel
+        if replace and amount == 0 and not position:
+            self.close()
+            return BET_NOT_FOUND, None, 0
+
+        new_amount = amount if replace else old_amount + amount
+
+        # Check the wallet covers the difference, reducing a position refunds it
+        delta = new_amount - old_amount
+        self.cursor.execute('INSERT OR IGNORE INTO user_points (user_id, points) VALUES (?, ?)', (user_id, 100))
+        self.cursor.execute('SELECT points FROM user_points WHERE user_id = ?', (user_id,))
+        if delta > self.cursor.fetchone()[0]:
+            self.close()
+            return BET_NOT_ENOUGH_POINTS, None, 0
+
+        # Save the new position, an empty position is removed
+        if new_amount > 0:
+            self.cursor.execute('''
+                INSERT INTO bets (guild_id, event_id, user_id, chosen_team, amount)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (guild_id, event_id, user_id) DO UPDATE
+                SET chosen_team = excluded.chosen_team, amount = excluded.amount
+            ''', (guild_id, event_id, user_id, team, new_amount))
+        else:
+            self.cursor.execute('DELETE FROM bets WHERE guild_id = ? AND event_id = ? AND user_id = ?', (guild_id, event_id, user_id))
+
+        # Log the change per team and move it between the running totals
+        pool_change = [0, 0]
+        changes = [(team, delta)] if same_team else [(old_team, -old_amount), (team, new_amount)]
+        for changed_team, change in changes:
+            if change:
+                self.cursor.execute('''
+                    INSERT INTO bet_log (guild_id, event_id, user_id, chosen_team, amount, placed_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (guild_id, event_id, user_id, changed_team, change, datetime.datetime.now()))
+                team1_change, team2_change = self.add_to_pool(guild_id, event_id, changed_team, change)
+                pool_change[0] += team1_change
+                pool_change[1] += team2_change
+
+        # Take the difference from the wallet in the same transaction
+        self.cursor.execute('UPDATE user_points SET points = points - ? WHERE user_id = ?', (delta, user_id))
+
+        self.close()
+        self.invalidate('points', user_id)
+        self.pool_changed(guild_id, event_id, pool_change)
+        return BET_PLACED, team, new_amount
+
+    def add_to_pool(self, guild_id, event_id, team, amount):
+        # Must be called on an open connection; the caller commits
+        self.cursor.execute('SELECT team1 FROM betting_events WHERE guild_id = ? AND event_id = ?', (guild_id, event_id))
+        is_team1 = team.lower() == self.cursor.fetchone()[0].lower()
+        team1_change, team2_change = (amount, 0) if is_team1 else (0, amount)
+
+        self.cursor.execute('''
+            INSERT INTO event_pools (guild_id, event_id, team1_total, team2_total)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (guild_id, event_id) DO UPDATE
+            SET team1_total = team1_total + excluded.team1_total,
+                team2_total = team2_total + excluded.team2_total
+        ''', (guild_id, event_id, team1_change, team2_change))
+
+        return team1_change, team2_change
+
+    def pool_changed(self, guild_id, event_id, pool_change):
+        # Only called after the commit, so nobody can reload the totals from before it
+        pool = self.pool_cache.get((guild_id, event_id))
+        if pool:
+            pool[0] += pool_change[0]
+            pool[1] += pool_change[1]
+        self.bump_event_version(guild_id, event_id)
+
+        # The other shard processes drop their copy and reload it
+        if self.on_invalidate:
+            self.on_invalidate('pools', (guild_id, event_id))
+
+    def get_event_pool(self, guild_id, event_id):
+        if (guild_id, event_id) in self.pool_cache:
+            return tuple(self.pool_cache[(guild_id, event_id)])
+
         self.connect()
 
-        # Insert a new bet into the bets table
+        # Retrieve the running totals for both teams
         self.cursor.execute('''
-            INSERT INTO bets (guild_id, event_id, user_id, chosen_team, amount)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (guild_id, event_id, user_id, team, amount))
+            SELECT team1_total, team2_total
+            FROM event_pools
+            WHERE guild_id = ? AND event_id = ?
+        ''', (guild_id, event_id))
+
+        pool = self.cursor.fetchone() or (0, 0)
 
+        # Close the connection
         self.close()
 
+        self.pool_cache[(guild_id, event_id)] = list(pool)
+        return pool
+
+    def get_pool_odds(self, guild_id, event_id):
+        # Payout per point bet on each team if the event ended now, None while a side has no bets
+        team1_total, team2_total = self.get_event_pool(guild_id, event_id)
+        odds1 = team2_total / team1_total if team1_total else None
+        odds2 = team1_total / team2_total if team2_total else None
+        return odds1, odds2
+
     def get_betting_end_time(self, guild_id, event_id):
         self.connect()
 
@@ -330,11 +705,14 @@ class DiscordDatabase:
         return is_active
     
     def get_active_events(self, guild_id):
+        if guild_id in self.events_cache:
+            return self.events_cache[guild_id]
+
         self.connect()
 
         # Retrieve active events from the betting_events table
         self.cursor.execute('''
-            SELECT event_id, team1, team2, odds1, odds2, betting_end_time
+            SELECT event_id, team1, team2, odds1, odds2, betting_end_time, parimutuel
             FROM betting_events
             WHERE guild_id = ? AND winner IS NULL
         ''', (guild_id,))
@@ -344,6 +722,8 @@ class DiscordDatabase:
         # Close the connection
         self.close()
 
+        self.events_cache[guild_id] = active_events
+
         return active_events
 
     def is_valid_team(self, guild_id, event_id, chosen_team):
@@ -381,18 +761,25 @@ class DiscordDatabase:
 
         return is_ended
 
-    def calculate_payouts(self, guild_id, event_id, winner_team):
-        self.connect()
-
+    def read_payouts(self, guild_id, event_id, winner_team):
+        # Must be called on an open connection
         # Retrieve winning odds from the betting_events table
         self.cursor.execute('''
-            SELECT odds1,odds2, team1
+            SELECT odds1,odds2, team1, parimutuel
             FROM betting_events
             WHERE guild_id = ? AND event_id = ?
         ''', (guild_id, event_id))
 
         query_result = self.cursor.fetchone()
-        winning_odds = query_result[0] if winner_team.lower() == query_result[2].lower() else query_result[1]
+        is_team1 = winner_team.lower() == query_result[2].lower()
+        winning_odds = query_result[0] if is_team1 else query_result[1]
+
+        # Parimutuel winners split the losing side's pool, read from the running totals
+        if query_result[3]:
+            self.cursor.execute('SELECT team1_total, team2_total FROM event_pools WHERE guild_id = ? AND event_id = ?', (guild_id, event_id))
+            team1_total, team2_total = self.cursor.fetchone() or (0, 0)
+            winning_total, losing_total = (team1_total, team2_total) if is_team1 else (team2_total, team1_total)
+            winning_odds = losing_total / winning_total if winning_total else 0
 
         print("winning odds", winning_odds)
 
@@ -403,27 +790,58 @@ class DiscordDatabase:
             WHERE guild_id = ? AND event_id = ? AND chosen_team COLLATE NOCASE = ?
         ''', (guild_id, event_id, winner_team))
 
-        winning_bets = {user_id: amount for user_id, amount in self.cursor.fetchall()}
-        print(winning_bets)
+        user_ids, amounts = read_bet_columns(self.cursor)
+        print(len(user_ids), "winning bets")
+
+        return float(winning_odds), user_ids, amounts
+
+    def settle_event(self, guild_id, event_id, winner_team):
+        # Marks the winner and pays every winning bet in one transaction.
+        # Returns None if the event had already ended, so it can never be paid twice.
+        self.connect(immediate=True)
+
+        self.cursor.execute('''
+            UPDATE betting_events
+            SET winner = ?
+            WHERE guild_id = ? AND event_id = ? AND winner IS NULL
+        ''', (winner_team, guild_id, event_id))
+
+        if self.cursor.rowcount == 0:
+            self.close()
+            return None
+
+        # Read the bets inside the transaction so a bet placed meanwhile is paid too
+        winning_odds, user_ids, amounts = self.read_payouts(guild_id, event_id, winner_team)
+        winnings = calculate_winnings(amounts, winning_odds)
+
+        # Return every winning bet plus its winnings
+        self.cursor.executemany('UPDATE user_points SET points = points + ? WHERE user_id = ?',
+                                zip(map(int.__add__, amounts, winnings), user_ids))
 
-        # Close the connection
         self.close()
+        self.invalidate('points', None)
+        self.invalidate('events', guild_id)
+        self.invalidate('ended', (guild_id, event_id))
 
-        return winning_odds, winning_bets
+        return winning_odds, user_ids, winnings
 
-    def mark_event_as_ended(self, guild_id, event_id, winner_team):
+    def get_event_winner(self, guild_id, event_id):
         self.connect()
 
-        # Update the winner column in the betting_events table
+        # Retrieve the winner, None while the event is still running
         self.cursor.execute('''
-            UPDATE betting_events
-            SET winner = ?
+            SELECT winner
+            FROM betting_events
             WHERE guild_id = ? AND event_id = ?
-        ''', (winner_team, guild_id, event_id))
+        ''', (guild_id, event_id))
 
-        # Commit the changes and close the connection
+        event = self.cursor.fetchone()
+
+        # Close the connection
         self.close()
 
+        return event[0] if event else None
+
     def get_bets_for_team(self, guild_id, event_id, chosen_team):
         self.connect()
 
@@ -0,0 +1,267 @@
+import argparse
+import json
+import sqlite3
+import DiscordDB
+
+# These run in a thread or from the command line, so they can wait for the bot's writers
+BUSY_TIMEOUT = 30
+
+# Backups are JSON lines: a {"table": ..., "columns": [...]} header, then one JSON array per row.
+# Every query streams with fetchmany, so memory use doesn't grow with the size of the guild.
+# Tables without a guild_id are shared by every guild; they can be limited to a set of users.
+EXPORT_QUERIES = [
+    ('user_points', '''
+        SELECT user_id, points
+        FROM user_points
+        WHERE :users IS NULL OR user_id IN (SELECT value FROM json_each(:users))
+    '''),
+    ('challenges', '''
+        SELECT id, name, points, unique_challenge
+        FROM challenges
+    '''),
+    ('completed_challenges', '''
+        SELECT user_id, challenge_id, completion_count
+        FROM completed_challenges
+        WHERE :users IS NULL OR user_id IN (SELECT value FROM json_each(:users))
+    '''),
+    ('betting_events', '''
+        SELECT guild_id, event_id, team1, team2, odds1, odds2, winner, betting_end_time, parimutuel
+        FROM betting_events
+        WHERE guild_id = :guild_id
+    '''),
+    ('bets', '''
+        SELECT guild_id, event_id, user_id, chosen_team, amount
+        FROM bets
+        WHERE guild_id = :guild_id
+    '''),
+    ('event_pools', '''
+        SELECT guild_id, event_id, team1_total, team2_total
+        FROM event_pools
+        WHERE guild_id = :guild_id
+    '''),
+    ('bet_log', '''
+        SELECT id, guild_id, event_id, user_id, chosen_team, amount, placed_at
+        FROM bet_log
+        WHERE guild_id = :guild_id
+    '''),
+]
+
+IMPORT_TABLES = [table for table, query in EXPORT_QUERIES]
+
+# AUTOINCREMENT ids are global to the database, so imported rows get new ones
+ID_COLUMNS = {'challenges': 'id', 'betting_events': 'event_id', 'bet_log': 'id'}
+
+# Tables whose new ids are needed by the rows that come after them in the file
+REMAPPED_TABLES = {'challenges', 'betting_events'}
+
+# Challenges are shared by every guild, one that already exists is reused instead of added again
+MATCH_COLUMNS = {'challenges': ['name', 'points', 'unique_challenge']}
+
+# Rows that may already be in the database are skipped. Users who already have points keep
+# their balance, since it may include points earned in other guilds after the export.
+INSERT_OR_IGNORE_TABLES = {'user_points', 'completed_challenges'}
+
+# Columns pointing at a remapped id: column -> table it refers to
+FOREIGN_IDS = {
+    'completed_challenges': {'challenge_id': 'challenges'},
+    'bets': {'event_id': 'betting_events'},
+    'event_pools': {'event_id': 'betting_events'},
+    'bet_log': {'event_id': 'betting_events'},
+}
+
+def export_guild(db_name, guild_id, path, user_ids=None):
+    # Uses its own connection so it can run in a thread next to the bot
+    conn = sqlite3.connect(db_name, timeout=BUSY_TIMEOUT, isolation_level=None)
+    cursor = conn.cursor()
+    params = {'guild_id': guild_id, 'users': json.dumps(list(user_ids)) if user_ids is not None else None}
+    exported = 0
+
+    try:
+        # One read transaction so every table comes from the same point in time
+        cursor.execute('BEGIN')
+        with open(path, 'w') as backup:
+            for table, query in EXPORT_QUERIES:
+                cursor.execute(query, params)
+                columns = [column[0] for column in cursor.description]
+                backup.write(json.dumps({'table': table, 'columns': columns}) + '\n')
+
+                rows = cursor.fetchmany(DiscordDB.FETCH_CHUNK)
+                while rows:
+                    backup.writelines(json.dumps(row) + '\n' for row in rows)
+                    exported += len(rows)
+                    rows = cursor.fetchmany(DiscordDB.FETCH_CHUNK)
+        cursor.execute('COMMIT')
+    finally:
+        conn.close()
+
+    return exported
+
+def import_file(db_name, path):
+    conn = sqlite3.connect(db_name, timeout=BUSY_TIMEOUT, isolation_level=None)
+    cursor = conn.cursor()
+    imported = 0
+
+    # Old id from the file -> new id in this database, per remapped table
+    id_maps = {table: {} for table in REMAPPED_TABLES}
+
+    # Guilds whose betting events were checked to not be in the database yet
+    new_guilds = set()
+
+    try:
+        # The whole file goes in as one transaction, a bad line leaves the database untouched
+        cursor.execute('BEGIN IMMEDIATE')
+        with open(path) as backup:
+            table = None
+            batch = []
+            for line in backup:
+                record = json.loads(line)
+
+                if isinstance(record, dict):
+                    if batch:
+                        cursor.executemany(statement, batch)
+                        batch = []
+                    table = record['table']
+                    statement, convert_row, find_existing = prepare_table(cursor, table, record['columns'], id_maps, new_guilds)
+                    continue
+
+                if table is None:
+                    raise ValueError("Backup file has rows before any table header.")
+
+                old_id, row = convert_row(record)
+                imported += 1
+
+                # Rows other tables point at go in one by one to learn their new id
+                if table in REMAPPED_TABLES:
+                    new_id = find_existing(row) if find_existing else None
+                    if new_id is None:
+                        cursor.execute(statement, row)
+                        new_id = cursor.lastrowid
+                    id_maps[table][old_id] = new_id
+                    continue
+
+                batch.append(row)
+                if len(batch) >= DiscordDB.FETCH_CHUNK:
+                    cursor.executemany(statement, batch)
+                    batch = []
+
+            if batch:
+                cursor.executemany(statement, batch)
+        cursor.execute('COMMIT')
+    except Exception:
+        if conn.in_transaction:
+            cursor.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
+
+    return imported
+
+def prepare_table(cursor, table, columns, id_maps, new_guilds):
+    # Table and column names come from the file, only accept ones that exist
+    if table not in IMPORT_TABLES:
+        raise ValueError(f"Unknown table '{table}' in backup file.")
+
+    cursor.execute(f'PRAGMA table_info({table})')
+    known_columns = {column[1] for column in cursor.fetchall()}
+    if not columns or not set(columns) <= known_columns:
+        raise ValueError(f"Unknown columns for table '{table}' in backup file.")
+
+    id_column = ID_COLUMNS.get(table)
+    if table in REMAPPED_TABLES and id_column not in columns:
+        raise ValueError(f"Table '{table}' in backup file has no '{id_column}' column.")
+    id_index = columns.index(id_column) if id_column in columns else None
+
+    foreign_ids = [(column, columns.index(column), id_maps[target])
+                   for column, target in FOREIGN_IDS.get(table, {}).items() if column in columns]
+
+    # Bets, pools and the log can only point at events from the file, so checking the events is enough
+    if table == 'betting_events' and 'guild_id' not in columns:
+        raise ValueError("Table 'betting_events' in backup file has no 'guild_id' column.")
+    guild_index = columns.index('guild_id') if table == 'betting_events' else None
+
+    def convert_row(record):
+        if len(record) != len(columns):
+            raise ValueError(f"Row with the wrong number of columns for table '{table}' in backup file.")
+
+        row = list(record)
+
+        # Importing a guild's events twice would copy every open bet without taking its stake
+        if guild_index is not None and row[guild_index] not in new_guilds:
+            cursor.execute('SELECT 1 FROM betting_events WHERE guild_id = ? LIMIT 1', (row[guild_index],))
+            if cursor.fetchone():
+                raise ValueError(f"Server {row[guild_index]} already has betting events in this database, nothing was imported.")
+            new_guilds.add(row[guild_index])
+
+        for column, index, id_map in foreign_ids:
+            if row[index] not in id_map:
+                raise ValueError(f"Row in '{table}' refers to {column} {row[index]}, which is not in the backup file.")
+            row[index] = id_map[row[index]]
+
+        # The database assigns a new id
+        old_id = None
+        if id_index is not None:
+            old_id = row.pop(id_index)
+        return old_id, row
+
+    insert = 'INSERT OR IGNORE' if table in INSERT_OR_IGNORE_TABLES else 'INSERT'
+    kept_columns = [column for column in columns if column != id_column]
+    statement = f"{insert} INTO {table} ({', '.join(kept_columns)}) VALUES ({', '.join('?' for column in kept_columns)})"
+
+    # Looks up an identical row already in the database, returns its id or None
+    find_existing = None
+    match_columns = MATCH_COLUMNS.get(table)
+    if match_columns:
+        if not set(match_columns) <= set(kept_columns):
+            raise ValueError(f"Table '{table}' in backup file is missing columns needed to match existing rows.")
+        match_indexes = [kept_columns.index(column) for column in match_columns]
+        match_query = f"SELECT {id_column} FROM {table} WHERE {' AND '.join(f'{column} IS ?' for column in match_columns)} LIMIT 1"
+
+        def find_existing(row):
+            cursor.execute(match_query, [row[index] for index in match_indexes])
+            existing = cursor.fetchone()
+            return existing[0] if existing else None
+
+    return statement, convert_row, find_existing
+
+def snapshot(db_name, path):
+    # One pass in a single read transaction. In WAL mode this never blocks the bot's writers,
+    # while a stepped backup restarts every time they write and may never finish.
+    source = sqlite3.connect(db_name, timeout=BUSY_TIMEOUT)
+    destination = sqlite3.connect(path)
+    try:
+        source.backup(destination, pages=-1)
+    finally:
+        destination.close()
+        source.close()
+
+# Usage:
+#   python EconomyBackup.py export {guild_id} {file}
+#   python EconomyBackup.py import {file}
+#   python EconomyBackup.py snapshot {file}
+def main():
+    parser = argparse.ArgumentParser(description="Back up or move a guild's economy")
+    parser.add_argument('--db', default='discord.db', help="Database file used by the bot")
+    subparsers = parser.add_subparsers(dest='action', required=True)
+
+    export_parser = subparsers.add_parser('export', help="Export one guild to a JSON lines file")
+    export_parser.add_argument('guild_id', type=int)
+    export_parser.add_argument('file')
+
+    import_parser = subparsers.add_parser('import', help="Import a JSON lines file made by export")
+    import_parser.add_argument('file')
+
+    snapshot_parser = subparsers.add_parser('snapshot', help="Copy the whole database while the bot is running")
+    snapshot_parser.add_argument('file')
+
+    args = parser.parse_args()
+
+    if args.action == 'export':
+        print(f"Exported {export_guild(args.db, args.guild_id, args.file)} rows to {args.file}")
+    elif args.action == 'import':
+        print(f"Imported {import_file(args.db, args.file)} rows from {args.file}")
+    else:
+        snapshot(args.db, args.file)
+        print(f"Snapshot saved to {args.file}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+import argparse
+import os
+import subprocess
+import sys
+
+# Runs the bot as several processes on this host, each owning a subset of the gateway shards.
+# Usage: python Launcher.py {processes} {shards} [--ipc-port 47000]
+def main():
+    parser = argparse.ArgumentParser(description="Run the bot as several shard processes")
+    parser.add_argument('processes', type=int, help="Number of bot processes to start")
+    parser.add_argument('shards', type=int, help="Total number of gateway shards")
+    parser.add_argument('--ipc-port', type=int, default=47000, help="First local port used for cache invalidation")
+    args = parser.parse_args()
+
+    if args.processes < 1 or args.shards < args.processes:
+        parser.error("Need at least one process and at least as many shards as processes.")
+
+    ports = [args.ipc_port + index for index in range(args.processes)]
+    bot_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'DiscordBot.py')
+
+    processes = []
+    for index in range(args.processes):
+        # Shards are dealt out round robin so every process gets a similar share of guilds
+        shard_ids = [shard for shard in range(args.shards) if shard % args.processes == index]
+
+        env = os.environ.copy()
+        env['SHARD_COUNT'] = str(args.shards)
+        env['SHARD_IDS'] = ','.join(str(shard) for shard in shard_ids)
+        env['IPC_PORT'] = str(ports[index])
+        env['IPC_PEERS'] = ','.join(str(port) for port in ports if port != ports[index])
+
+        print(f"Starting process {index} with shards {shard_ids}")
+        processes.append(subprocess.Popen([sys.executable, bot_script], env=env))
+
+    try:
+        for process in processes:
+            process.wait()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+if __name__ == '__main__':
+    main()
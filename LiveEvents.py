@@ -0,0 +1,38 @@
+# Keeps posted !events messages current. Views subscribe to the events they page through,
+# and each database change to an event is passed on to the views showing it.
+class LiveEventUpdater:
+    def __init__(self, db):
+        # (guild_id, event_id) -> views paging through that event
+        self.subscribers = {}
+        db.event_listeners.append(self.event_changed)
+        db.event_end_listeners.append(self.event_ended)
+
+    def subscribe(self, guild_id, event_ids, view):
+        for event_id in event_ids:
+            self.subscribers.setdefault((guild_id, event_id), set()).add(view)
+
+    def is_subscribed(self, view):
+        return any(view in views for views in self.subscribers.values())
+
+    def unsubscribe(self, view):
+        for key in list(self.subscribers):
+            self.subscribers[key].discard(view)
+            if not self.subscribers[key]:
+                del self.subscribers[key]
+
+    def event_changed(self, guild_id, event_id):
+        # Views throttle and combine the edits themselves
+        for view in self.subscribers.get((guild_id, event_id), ()):
+            view.event_changed(event_id)
+
+    def event_ended(self, guild_id, event_id):
+        # An ended event never changes again, a view stops following once all of its events ended
+        for view in self.subscribers.pop((guild_id, event_id), ()):
+            if not self.is_subscribed(view):
+                view.events_ended()
+
+    def message_deleted(self, message_id):
+        for view in [view for views in self.subscribers.values() for view in views]:
+            if view.message.id == message_id:
+                view.stop_following()
+                view.stop()
@@ -1,17 +1,57 @@
+import asyncio
+import json
+import time
 import discord
 from discord.ext import commands
 
+# Button presses within this many seconds are combined into a single message edit
+DEBOUNCE_SECONDS = 0.5
+
+# Edits caused by new bets happen at most once per this many seconds per message
+LIVE_UPDATE_SECONDS = 5
+
+# Live views have no timeout, once all their events ended the buttons keep working this long
+ENDED_TIMEOUT_SECONDS = 180
+
 class PaginationView(discord.ui.View):
     current_page : int = 0
 
+    # Hash of the last embed and page sent, so unchanged pages aren't edited again
+    last_render = None
+    last_edit_time = 0
+    pending_update = None
+
+    # Set when the message needs redrawing, the render task loops until it is clear
+    dirty = False
+    render_task = None
+
+    # Set by the command when the view should follow new bets, with its own timer
+    # so a waiting live update never holds up the button debounce
+    live_updater = None
+    live_update = None
+
+    # Optional callbacks set by the command: the current version of a page's data,
+    # and rebuilding a page whose version is out of date
+    get_page_version = None
+    refresh_page = None
+
     async def send(self, ctx):
         self.message = await ctx.send(view=self)
         await self.update_message(self.data[self.current_page])
 
     def create_bet_events_embed(self, data):
-        embed = discord.Embed(title=f"Betting Event #{data['event_id']}", color=discord.Color.blue())
+        if data.get('winner'):
+            embed = discord.Embed(title=f"Betting Event #{data['event_id']} (ended)", color=discord.Color.dark_grey())
+            embed.add_field(name="Winner", value=data['winner'], inline=False)
+        else:
+            embed = discord.Embed(title=f"Betting Event #{data['event_id']}", color=discord.Color.blue())
         embed.add_field(name="Teams", value=f"{data['team1']} vs. {data['team2']}", inline=False)
-        embed.add_field(name="Odds", value=f"{data['odds1']} : {data['odds2']}", inline=False)
+        if data.get('parimutuel'):
+            # Live odds from the pool, a side without bets has no odds yet
+            odds = [f"{odds:.2f}" if odds is not None else "-" for odds in (data['odds1'], data['odds2'])]
+            embed.add_field(name="Odds (live pool)", value=f"{odds[0]} : {odds[1]}", inline=False)
+        else:
+            embed.add_field(name="Odds", value=f"{data['odds1']} : {data['odds2']}", inline=False)
         embed.add_field(name="Betting period ends", value=f"<t:{data['unix_timestamp']}:f> or <t:{data['unix_timestamp']}:R>", inline=False)
         embed.add_field(name=f"Bets on {data['team1']}", value='\n'.join([f'{user} ({amount} points)' for user, amount in data['team1_bets_with_usernames']]))
         embed.add_field(name=f"Bets on {data['team2']}", value='\n'.join([f'{user} ({amount} points)' for user, amount in data['team2_bets_with_usernames']]))
@@ -21,8 +61,69 @@ class PaginationView(discord.ui.View):
         return embed
 
     async def update_message(self, data):
+        embed = self.create_bet_events_embed(data)
+
+        # Skip the edit when neither the embed nor the page changed
+        render = hash((self.current_page, json.dumps(embed.to_dict(), sort_keys=True)))
+        if render == self.last_render:
+            return
+
         self.update_buttons()
-        await self.message.edit(embed=self.create_bet_events_embed(data), view=self)
+        self.last_edit_time = time.monotonic()
+        await self.message.edit(embed=embed, view=self)
+
+        # Only remembered once the edit went through, a failed edit is retried on the next render
+        self.last_render = render
+
+    def schedule_update(self, delay=DEBOUNCE_SECONDS):
+        # Rapid clicks only move current_page, one edit shows wherever they ended up
+        if self.pending_update is None or self.pending_update.done():
+            self.pending_update = asyncio.create_task(self.debounced_update(delay))
+
+    async def debounced_update(self, delay):
+        await asyncio.sleep(delay)
+        self.request_render()
+
+    def request_render(self):
+        # Edits never overlap, a click that lands during an edit is drawn right after it
+        self.dirty = True
+        if self.render_task is None or self.render_task.done():
+            self.render_task = asyncio.create_task(self.render())
+
+    async def render(self):
+        while self.dirty:
+            self.dirty = False
+            try:
+                await self.update_message(self.get_current_page_data())
+            except discord.NotFound:
+                # The message is gone, nothing left to keep current
+                self.stop_following()
+                self.stop()
+                return
+            except Exception as e:
+                # Nobody awaits this task, so report the error instead of losing it
+                print(f"Error updating the events message: {e}")
+
+    def event_changed(self, event_id):
+        # Only the page on screen is redrawn, other pages refresh when navigated to
+        if self.data[self.current_page]['event_id'] != event_id:
+            return
+        if self.live_update is None or self.live_update.done():
+            delay = max(0, self.last_edit_time + LIVE_UPDATE_SECONDS - time.monotonic())
+            self.live_update = asyncio.create_task(self.debounced_update(delay))
+
+    def events_ended(self):
+        # The last redraw is already scheduled by event_changed, after that the page can't change
+        self.live_updater = None
+        asyncio.get_running_loop().call_later(ENDED_TIMEOUT_SECONDS, self.stop)
+
+    def stop_following(self):
+        if self.live_updater:
+            self.live_updater.unsubscribe(self)
+            self.live_updater = None
+
+    async def on_timeout(self):
+        self.stop_following()
 
     def update_buttons(self):
         if self.current_page == 0:
@@ -36,7 +137,7 @@ class PaginationView(discord.ui.View):
             self.first_page_button.style = discord.ButtonStyle.green
             self.prev_button.style = discord.ButtonStyle.primary
 
-        if self.current_page == int(len(self.data)):
+        if self.current_page == len(self.data) - 1:
             self.next_button.disabled = True
             self.last_page_button.disabled = True
             self.last_page_button.style = discord.ButtonStyle.gray
@@ -48,7 +149,13 @@ class PaginationView(discord.ui.View):
             self.next_button.style = discord.ButtonStyle.primary
 
     def get_current_page_data(self):
-        return self.data[self.current_page]
+        data = self.data[self.current_page]
+
+        # Rebuild the page only if its event or bets changed since it was built
+        if self.get_page_version and self.get_page_version(data) != data.get('version'):
+            data = self.data[self.current_page] = self.refresh_page(data)
+
+        return data
 
 
     @discord.ui.button(label="|<",
@@ -56,7 +163,7 @@ class PaginationView(discord.ui.View):
     async def first_page_button(self, interaction:discord.Interaction, button: discord.ui.Button):
         await interaction.response.defer()
         self.current_page = 0
-        await self.update_message(self.get_current_page_data())
+        self.schedule_update()
 
     @discord.ui.button(label="<",
                        style=discord.ButtonStyle.primary)
@@ -64,22 +171,20 @@ class PaginationView(discord.ui.View):
         await interaction.response.defer()
         if self.current_page > 0:
             self.current_page -= 1
-        await self.update_message(self.get_current_page_data())
+        self.schedule_update()
 
     @discord.ui.button(label=">",
                        style=discord.ButtonStyle.primary)
     async def next_button(self, interaction:discord.Interaction, button: discord.ui.Button):
         await interaction.response.defer()
         max_len = len(self.data)
-        print(max_len)
-        print(self.current_page)
         if self.current_page < max_len - 1:
             self.current_page += 1
-        await self.update_message(self.get_current_page_data())
+        self.schedule_update()
 
     @discord.ui.button(label=">|",
                        style=discord.ButtonStyle.green)
     async def last_page_button(self, interaction:discord.Interaction, button: discord.ui.Button):
         await interaction.response.defer()
-        self.current_page = int(len(self.data))
-        await self.update_message(self.get_current_page_data())
\ No newline at end of file
+        self.current_page = len(self.data) - 1
+        self.schedule_update()
\ No newline at end of file
@@ -0,0 +1,104 @@
+import itertools
+import logging
+import logging.handlers
+import sqlite3
+import time
+
+# Statements EXPLAIN QUERY PLAN can describe
+EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'WITH')
+
+class QueryProfiler:
+    def __init__(self, slow_query_ms=50, log_file='slow_queries.log'):
+        self.slow_query_seconds = slow_query_ms / 1000
+
+        # statement -> [calls, total seconds, max seconds, rows]
+        self.stats = {}
+
+        # Query plans already captured, one per statement
+        self.plans = {}
+
+        # Rolling slow query log, a few files of 1 MB each
+        self.log = logging.getLogger('slow_queries')
+        self.log.setLevel(logging.INFO)
+        self.log.propagate = False
+        if not self.log.handlers:
+            handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=1_000_000, backupCount=3)
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            self.log.addHandler(handler)
+
+    def record(self, statement, elapsed, rows=0):
+        stat = self.stats.setdefault(statement, [0, 0.0, 0.0, 0])
+        stat[0] += 1
+        stat[1] += elapsed
+        stat[2] = max(stat[2], elapsed)
+        stat[3] += rows
+
+    def add_rows(self, statement, rows):
+        if statement in self.stats:
+            self.stats[statement][3] += rows
+
+    def slow_query(self, connection, statement, parameters, elapsed):
+        if statement not in self.plans and statement.upper().startswith(EXPLAINABLE):
+            try:
+                plan = connection.execute('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+                self.plans[statement] = '; '.join(row[-1] for row in plan)
+            except sqlite3.Error as e:
+                self.plans[statement] = f"no plan ({e})"
+
+        self.log.info(f"{elapsed * 1000:.1f} ms | {statement} | plan: {self.plans.get(statement, '-')}")
+
+    def top(self, limit=10):
+        # (statement, calls, total seconds, max seconds, rows), slowest total first
+        ranked = sorted(self.stats.items(), key=lambda item: item[1][1], reverse=True)
+        return [(statement, *stat) for statement, stat in ranked[:limit]]
+
+class ProfilingCursor(sqlite3.Cursor):
+    # Set by DiscordDatabase.connect right after the cursor is created
+    profiler = None
+    statement = None
+
+    def execute(self, sql, parameters=()):
+        self.statement = ' '.join(sql.split())
+        start = time.perf_counter()
+        result = super().execute(sql, parameters)
+        elapsed = time.perf_counter() - start
+
+        # Rows changed count now, rows read are added as they are fetched
+        self.profiler.record(self.statement, elapsed, max(self.rowcount, 0))
+        if elapsed > self.profiler.slow_query_seconds:
+            self.profiler.slow_query(self.connection, self.statement, parameters, elapsed)
+        return result
+
+    def executemany(self, sql, seq_of_parameters):
+        self.statement = ' '.join(sql.split())
+
+        # Keep the first parameter set for the query plan without consuming a streamed sequence
+        seq_of_parameters = iter(seq_of_parameters)
+        first_parameters = next(seq_of_parameters, None)
+        if first_parameters is not None:
+            seq_of_parameters = itertools.chain([first_parameters], seq_of_parameters)
+
+        start = time.perf_counter()
+        result = super().executemany(sql, seq_of_parameters)
+        elapsed = time.perf_counter() - start
+
+        self.profiler.record(self.statement, elapsed, max(self.rowcount, 0))
+        if elapsed > self.profiler.slow_query_seconds and first_parameters is not None:
+            self.profiler.slow_query(self.connection, self.statement, first_parameters, elapsed)
+        return result
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            self.profiler.add_rows(self.statement, 1)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(size) if size is not None else super().fetchmany()
+        self.profiler.add_rows(self.statement, len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        self.profiler.add_rows(self.statement, len(rows))
+        return rows
@@ -0,0 +1,41 @@
+import asyncio
+import json
+
+# Shard processes run on the same host and share discord.db. Each process caches
+# balances and active events, and tells its peers over localhost UDP which keys
+# to drop after it writes.
+class CacheInvalidator(asyncio.DatagramProtocol):
+    def __init__(self, db, port, peer_ports):
+        self.db = db
+        self.port = port
+        self.peer_ports = peer_ports
+        self.transport = None
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        await loop.create_datagram_endpoint(lambda: self, local_addr=('127.0.0.1', self.port))
+
+        # Publish every local write to the other processes
+        self.db.on_invalidate = self.publish
+        print(f"Cache invalidation listening on port {self.port}, peers: {self.peer_ports}")
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def publish(self, kind, key):
+        if self.transport is None:
+            return
+
+        message = json.dumps([kind, key]).encode()
+        for peer_port in self.peer_ports:
+            self.transport.sendto(message, ('127.0.0.1', peer_port))
+
+    def datagram_received(self, data, addr):
+        try:
+            kind, key = json.loads(data)
+        except ValueError:
+            print(f"Ignoring malformed invalidation message from {addr}")
+            return
+
+        # Drop the local copy without echoing the message back to the peers
+        self.db.invalidate(kind, key, publish=False)
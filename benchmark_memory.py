@@ -0,0 +1,67 @@
+import argparse
+import datetime
+import os
+import sqlite3
+import tempfile
+import tracemalloc
+import DiscordDB
+
+# Compares peak memory of settling an event through the old dict of winning bets
+# with the array-backed columns used by DiscordDatabase.settle_event.
+# Usage: python benchmark_memory.py [--bets 50000]
+WINNING_BETS_QUERY = '''
+    SELECT user_id, amount
+    FROM bets
+    WHERE guild_id = ? AND event_id = ? AND chosen_team COLLATE NOCASE = ?
+'''
+
+def dict_path(db_name, event_id, odds):
+    conn = sqlite3.connect(db_name)
+    cursor = conn.execute(WINNING_BETS_QUERY, (1, event_id, 'A'))
+    winning_bets = {user_id: amount for user_id, amount in cursor.fetchall()}
+    payouts = {user_id: int(amount * odds) for user_id, amount in winning_bets.items()}
+    conn.close()
+    return len(payouts)
+
+def array_path(db_name, event_id, odds):
+    conn = sqlite3.connect(db_name)
+    cursor = conn.execute(WINNING_BETS_QUERY, (1, event_id, 'A'))
+    user_ids, amounts = DiscordDB.read_bet_columns(cursor)
+    payouts = DiscordDB.calculate_winnings(amounts, odds)
+    conn.close()
+    return len(payouts)
+
+def peak_memory(function, *args):
+    tracemalloc.start()
+    function(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory benchmark for payout computation")
+    parser.add_argument('--bets', type=int, default=50000, help="Number of winning bets")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        db_name = os.path.join(folder, 'benchmark.db')
+        db = DiscordDB.DiscordDatabase(db_name)
+        db.create_tables()
+        event_id = db.create_event(1, 'A', 'B', 1.5, 2.0, datetime.datetime.now())
+
+        # Snowflake-sized user IDs, like real Discord IDs
+        conn = sqlite3.connect(db_name)
+        conn.executemany('INSERT INTO bets (guild_id, event_id, user_id, chosen_team, amount) VALUES (1, ?, ?, ?, ?)',
+                         ((event_id, 10**17 + index, 'A', 100 + index % 500) for index in range(args.bets)))
+        conn.commit()
+        conn.close()
+
+        dict_peak = peak_memory(dict_path, db_name, event_id, 1.5)
+        array_peak = peak_memory(array_path, db_name, event_id, 1.5)
+
+    print(f"{args.bets} winning bets")
+    print(f"dict path:  {dict_peak / 2**20:6.2f} MiB peak")
+    print(f"array path: {array_peak / 2**20:6.2f} MiB peak ({dict_peak / array_peak:.1f}x less)")
+
+if __name__ == '__main__':
+    main()
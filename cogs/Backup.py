@@ -0,0 +1,73 @@
+import asyncio
+import datetime
+import os
+import discord
+from discord.ext import commands
+import EconomyBackup
+
+BACKUP_FOLDER = 'backups'
+
+# ================================= Backup ==================================== #
+class Backup(commands.Cog):
+    def __init__(self, bot, db):
+        self.bot = bot
+        self.db = db
+
+    def backup_path(self, name):
+        os.makedirs(BACKUP_FOLDER, exist_ok=True)
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        return os.path.join(BACKUP_FOLDER, f"{name}_{timestamp}")
+
+    @commands.command(name='export', help="!export \nExport this server's points, challenges and bets as a file")
+    async def export(self, ctx):
+        try:
+            # Check if the command user is the server owner
+            if ctx.author.id != ctx.guild.owner_id:
+                await ctx.send("Only the server owner can use this command.")
+                return
+
+            # Balances and challenges are shared between servers, only export this server's members
+            path = self.backup_path(f"guild_{ctx.guild.id}") + '.jsonl'
+            member_ids = [member.id for member in ctx.guild.members]
+
+            # Run in a thread so the bot keeps answering while the file is written
+            rows = await asyncio.to_thread(EconomyBackup.export_guild, self.db.db_name, ctx.guild.id, path, member_ids)
+
+            await ctx.send(f"Exported {rows} rows.", file=discord.File(path))
+        except Exception as e:
+            await ctx.send(f"An error occurred: {e}")
+
+    @commands.command(name='import', help="!import \nImport an attached file made by !export (bot owner only)")
+    @commands.is_owner()
+    async def import_backup(self, ctx):
+        try:
+            if not ctx.message.attachments:
+                await ctx.send("Attach a file made by !export.")
+                return
+
+            path = self.backup_path("import") + '.jsonl'
+            await ctx.message.attachments[0].save(path)
+
+            rows = await asyncio.to_thread(EconomyBackup.import_file, self.db.db_name, path)
+
+            # Cached balances, events and pools may all have changed
+            for kind in ('points', 'events', 'pools'):
+                self.db.invalidate(kind, None)
+
+            await ctx.send(f"Imported {rows} rows.")
+        except Exception as e:
+            await ctx.send(f"An error occurred: {e}")
+
+    @commands.command(name='snapshot', help="!snapshot \nSave a copy of the whole database without stopping the bot (bot owner only)")
+    @commands.is_owner()
+    async def snapshot(self, ctx):
+        try:
+            path = self.backup_path("discord") + '.db'
+            await asyncio.to_thread(EconomyBackup.snapshot, self.db.db_name, path)
+            await ctx.send(f"Snapshot saved to {path}.")
+        except Exception as e:
+            await ctx.send(f"An error occurred: {e}")
+
+async def setup(bot):
+    # The database is owned by the bot and injected into the cog
+    await bot.add_cog(Backup(bot, bot.db))
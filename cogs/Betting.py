@@ -0,0 +1,280 @@
+import datetime
+import itertools
+from discord.ext import commands
+import DiscordDB
+import PaginationView
+
+# Winners named in the !end_event summary, the rest are counted to stay under Discord's message limit
+MAX_LISTED_WINNERS = 20
+
+# ================================= Betting ==================================== #
+class Betting(commands.Cog):
+    def __init__(self, bot, db):
+        self.bot = bot
+        self.db = db
+
+    # Command to create a new betting event
+    @commands.command(name='create_event', help="!create_event {team1} {team2} {odds1} {odds2} {year-month-day_00:00:00} \nCreates a betting event of two teams with their odds and the betting period starting now")
+    async def create_event(self, ctx, team1, team2, odds1, odds2, match_time):
+        try:
+            guild_id = ctx.guild.id
+            odds1 = float(odds1)
+            odds2 = float(odds2)
+            match_time = datetime.datetime.strptime(match_time, "%Y-%m-%d_%H:%M:%S")
+            print(match_time)
+
+            # Calculate the end time of the betting period
+            betting_end_time = match_time
+
+            # Create the event in the database
+            event_id = self.db.create_event(guild_id, team1, team2, odds1, odds2, betting_end_time)
+
+            # Convert betting_end_time to Unix timestamp
+            unix_timestamp = int(betting_end_time.timestamp())
+
+            await ctx.send(f"Event ID: {event_id} created successfully! Betting duration ends at: <t:{unix_timestamp}:f> or <t:{unix_timestamp}:R>")
+        except ValueError:
+            await ctx.send("Invalid odds or duration. Please provide valid numbers.")
+        except Exception as e:
+            await ctx.send(f"An error occurred: {e}")
+
+    # Command to create a betting event whose odds come from the bets placed on it
+    @commands.command(name='create_pool_event', help="!create_pool_event {team1} {team2} {year-month-day_00:00:00} \nCreates a betting event where the winners split the points bet on the losing team")
+    async def create_pool_event(self, ctx, team1, team2, match_time):
+        try:
+            guild_id = ctx.guild.id
+            betting_end_time = datetime.datetime.strptime(match_time, "%Y-%m-%d_%H:%M:%S")
+
+            # Create the event in the database, the odds are calculated from the live pool
+            event_id = self.db.create_event(guild_id, team1, team2, 0, 0, betting_end_time, parimutuel=True)
+
+            # Convert betting_end_time to Unix timestamp
+            unix_timestamp = int(betting_end_time.timestamp())
+
+            await ctx.send(f"Pool event ID: {event_id} created successfully! Betting duration ends at: <t:{unix_timestamp}:f> or <t:{unix_timestamp}:R>")
+        except ValueError:
+            await ctx.send("Invalid duration. Please use year-month-day_00:00:00.")
+        except Exception as e:
+            await ctx.send(f"An error occurred: {e}")
+
+    # Command to place a bet, or add to an existing bet on the same team
+    @commands.command(name='bet', help="!bet {eventID} {chosen_team} {amount} \nBet on a team with your money and pray that you win. Betting again adds to your bet")
+    async def bet(self, ctx, event_id, chosen_team, amount):
+        try:
+            user_id = ctx.author.id
+            guild_id = ctx.guild.id
+            event_id = int(event_id)
+            amount = int(amount)
+
+            if amount <= 0:
+                await ctx.send("The amount must be a positive number of points.")
+                return
+
+            if not await self.check_betting_open(ctx, guild_id, event_id, chosen_team):
+                return
+
+            # Place the bet and deduct the points from the user's wallet
+            print("placing bet")
+            result, team, total = self.db.place_bet(guild_id, event_id, user_id, chosen_team, amount)
+
+            # Switching teams goes through !change_bet so nobody switches by accident
+            if result == DiscordDB.BET_OTHER_TEAM:
+                await ctx.send(f"You already bet on {team}. Use !change_bet to switch teams.")
+                return
+
+            if result == DiscordDB.BET_NOT_ENOUGH_POINTS:
+                await ctx.send("You don't have enough points to place that bet.")
+                return
+
+            await ctx.send(f"Bet placed! You have {total} points on {chosen_team}. Good luck!")
+        except ValueError:
+            await ctx.send("Invalid event ID or amount. Please provide valid integers.")
+        except Exception as e:
+            await ctx.send(f"An error occurred: {e}")
+
+    # Command to reduce, increase, switch or cancel a bet
+    @commands.command(name='change_bet', help="!change_bet {eventID} {chosen_team} {amount} \nReplace your bet on an event with amount points on chosen_team. An amount of 0 cancels your bet")
+    async def change_bet(self, ctx, event_id, chosen_team, amount):
+        try:
+            user_id = ctx.author.id
+            guild_id = ctx.guild.id
+            event_id = int(event_id)
+            amount = int(amount)
+
+            if amount < 0:
+                await ctx.send("The amount can't be negative.")
+                return
+
+            if not await self.check_betting_open(ctx, guild_id, event_id, chosen_team):
+                return
+
+            # Replace the position, the wallet is adjusted by the difference
+            print("changing bet")
+            result, team, total = self.db.place_bet(guild_id, event_id, user_id, chosen_team, amount, replace=True)
+
+            if result == DiscordDB.BET_NOT_FOUND:
+                await ctx.send("You don't have a bet on this event.")
+                return
+
+            if result == DiscordDB.BET_NOT_ENOUGH_POINTS:
+                await ctx.send("You don't have enough points to change your bet to that amount.")
+                return
+
+            if amount:
+                await ctx.send(f"Bet changed! You have {amount} points on {chosen_team}. Good luck!")
+            else:
+                await ctx.send("Your bet has been cancelled and your points refunded.")
+        except ValueError:
+            await ctx.send("Invalid event ID or amount. Please provide valid integers.")
+        except Exception as e:
+            await ctx.send(f"An error occurred: {e}")
+
+    async def check_betting_open(self, ctx, guild_id, event_id, chosen_team):
+        # Check if the event is still active in the database
+        print("Checking if event is still active")
+        if not self.db.is_event_active(guild_id, event_id):
+            await ctx.send("Invalid event ID. Make sure the event is still active.")
+            return False
+
+        # Check if the chosen team is valid
+        print("check if the team is valid")
+        if not self.db.is_valid_team(guild_id, event_id, chosen_team):
+            await ctx.send("Invalid team. Choose a team from the active events.")
+            return False
+
+        # Check if the betting period has ended
+        print("Check if betting period is over")
+        if datetime.datetime.now() > self.db.get_betting_end_time(guild_id, event_id):
+            await ctx.send("Betting period has ended.")
+            return False
+
+        return True
+
+    # Command to end a betting event and declare the winner
+    @commands.command(name='end_event', help="!end_event {event_id} {winning_team} \nEnd the event and specify who won. Payouts will be given")
+    async def end_event(self, ctx, event_id, winner_team):
+        try:
+            user_id = ctx.author.id
+            guild_id = ctx.guild.id
+            event_id = int(event_id)
+
+            # Check if the event is still active in the database
+            print("checking event active")
+            if not self.db.is_event_active(guild_id, event_id):
+                await ctx.send("Invalid event ID. Make sure the event is still active.")
+                return
+
+            # Check if the event has already been ended
+            print("check if event ended")
+            if self.db.is_event_ended(guild_id, event_id):
+                await ctx.send("This event has already been ended.")
+                return
+
+            # Validate that the winning team exists in the event (you need to implement this function)
+            print("check if team is valid")
+            if not self.db.is_valid_team(guild_id, event_id, winner_team):
+                await ctx.send(f"The specified winning team '{winner_team}' does not exist in the event.")
+                return
+
+            # Set the winner and pay out in one transaction, only the first !end_event gets past this
+            print("settle event")
+            settlement = self.db.settle_event(guild_id, event_id, winner_team)
+            if settlement is None:
+                await ctx.send("This event has already been ended.")
+                return
+
+            # One summary message, members who left the server are shown by ID
+            winning_odds, user_ids, payouts = settlement
+            summary = f"The winner is {winner_team}! Payouts have been processed.\n"
+            for user_id, payout in itertools.islice(zip(user_ids, payouts), MAX_LISTED_WINNERS):
+                member = ctx.guild.get_member(user_id)
+                name = member.mention if member else f"User {user_id}"
+                summary += f"{name} won {payout} points!\n"
+            if len(user_ids) > MAX_LISTED_WINNERS:
+                summary += f"...and {len(user_ids) - MAX_LISTED_WINNERS} more winners. Congratulations!"
+
+            await ctx.send(summary)
+        except ValueError:
+            await ctx.send("Invalid event ID. Please provide a valid integer.")
+        except Exception as e:
+            await ctx.send(f"An error occurred: {e}")
+
+    # Command to display a list of events with user bets
+    @commands.command(name='events', help="!events \nGet a list of betting events currently happening")
+    async def list_events(self, ctx):
+        try:
+            guild_id = ctx.guild.id
+
+            # Retrieve the list of active events from the database
+            active_events = self.db.get_active_events(guild_id)
+
+            # Check if there are any active events
+            if not active_events:
+                await ctx.send("No active events available.")
+                return
+
+            # Format and send the list of active events in a Discord message
+            event_list = [self.build_event_page(ctx.guild, ctx.author.id, event) for event in active_events]
+            # No timeout, the view follows its events until they end or the message is deleted
+            pagination_view = PaginationView.PaginationView(timeout=None)
+            pagination_view.data = event_list
+
+            # Pages are rebuilt only when their event or bets changed since they were built
+            pagination_view.get_page_version = lambda data: self.db.get_event_version(guild_id, data['event_id'])
+            pagination_view.refresh_page = lambda data: self.build_event_page(ctx.guild, ctx.author.id, data['event'])
+            await pagination_view.send(ctx)
+
+            # Keep the message current as bets come in, once there is a message to edit
+            pagination_view.live_updater = self.bot.live_updater
+            self.bot.live_updater.subscribe(guild_id, [data['event_id'] for data in event_list], pagination_view)
+        except Exception as e:
+            await ctx.send(f"An error occurred: {e}")
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload):
+        # Stop keeping a deleted !events message current
+        self.bot.live_updater.message_deleted(payload.message_id)
+
+    def build_event_page(self, guild, author_id, event):
+        event_id, team1, team2, odds1, odds2, betting_end_time, parimutuel = event
+        unix_timestamp  = int(datetime.datetime.strptime(betting_end_time, "%Y-%m-%d %H:%M:%S").timestamp())
+
+        # Read the version first so a change made while building leaves the page out of date
+        version = self.db.get_event_version(guild.id, event_id)
+
+        # Retrieve user bets for each team from the database
+        team1_bets = self.db.get_bets_for_team(guild.id, event_id, team1)
+        team2_bets = self.db.get_bets_for_team(guild.id, event_id, team2)
+
+        # Convert user IDs to usernames, members who left the server are shown by ID
+        team1_bets_with_usernames = [(self.get_username(guild, user_id), amount) for user_id, amount in team1_bets]
+        team2_bets_with_usernames = [(self.get_username(guild, user_id), amount) for user_id, amount in team2_bets]
+        user_balance = self.db.get_user_points(author_id)
+
+        # Pool events show the odds implied by the running totals
+        if parimutuel:
+            odds1, odds2 = self.db.get_pool_odds(guild.id, event_id)
+
+        return {
+            "event": event,
+            "version": version,
+            "winner": self.db.get_event_winner(guild.id, event_id),
+            "event_id": event_id,
+            "team1": team1,
+            "team2": team2,
+            "odds1": odds1,
+            "odds2": odds2,
+            "parimutuel": bool(parimutuel),
+            "unix_timestamp": unix_timestamp,
+            "team1_bets_with_usernames" : team1_bets_with_usernames,
+            "team2_bets_with_usernames": team2_bets_with_usernames,
+            "user_balance": user_balance
+        }
+
+    def get_username(self, guild, user_id):
+        member = guild.get_member(user_id)
+        return member.name if member else f"User {user_id}"
+
+async def setup(bot):
+    # The database is owned by the bot and injected into the cog
+    await bot.add_cog(Betting(bot, bot.db))
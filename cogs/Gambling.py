@@ -0,0 +1,39 @@
+import random
+from discord.ext import commands
+
+# ================================= Gambling =================================== #
+class Gambling(commands.Cog):
+    def __init__(self, bot, db):
+        self.bot = bot
+        self.db = db
+
+    @commands.command(name='50/50', help="!50/50 \nYou have a 50/50 chance of doubling the amount you invest")
+    async def fifty_fifty(self, ctx, amount):
+        try:
+            user_id = ctx.author.id
+            amount = int(amount)
+
+            # Check if the user has enough points to place the bet
+            user_points = self.db.get_user_points(user_id)
+            if amount > user_points:
+                await ctx.send("You don't have enough points to place that bet.")
+                return
+
+            # Simulate a bet outcome (you can replace this with your own logic)
+            win = random.choice([True, False])
+
+            # Update user points based on the bet outcome
+            if win:
+                self.db.update_user_points(user_id, amount)
+                await ctx.send(f"Congratulations! You won {amount} points. Your total points: {user_points + amount}")
+            else:
+                self.db.update_user_points(user_id, -amount)
+                await ctx.send(f"Oops! You lost {amount} points. Your total points: {user_points - amount}")
+        except ValueError:
+            await ctx.send("Invalid bet amount. Please provide a positive integer.")
+        except Exception as e:
+            await ctx.send(f"An error occurred: {e}")
+
+async def setup(bot):
+    # The database is owned by the bot and injected into the cog
+    await bot.add_cog(Gambling(bot, bot.db))
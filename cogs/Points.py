@@ -0,0 +1,96 @@
+import datetime
+import os
+from discord.ext import commands, tasks
+
+# Points given by !daily
+DAILY_CLAIM_POINTS = 50
+
+# Points given to every user at midnight UTC, 0 turns the job off
+DAILY_STIPEND = int(os.getenv('DAILY_STIPEND', 0))
+
+def today():
+    return datetime.datetime.now(datetime.timezone.utc).date().toordinal()
+
+# ================================= Points  ==================================== #
+class Points(commands.Cog):
+    def __init__(self, bot, db):
+        self.bot = bot
+        self.db = db
+
+        # Users who claimed !daily on claim_day, loaded from the database once per day
+        self.claim_day = None
+        self.claimed_today = set()
+
+    async def cog_load(self):
+        if DAILY_STIPEND:
+            self.daily_stipend.start()
+
+    async def cog_unload(self):
+        self.daily_stipend.cancel()
+
+    @commands.command(name='points', help="!points \nShow your current points")
+    async def check_points(self, ctx):
+        # Check and display user points
+        user_id = str(ctx.author.id)
+        points = self.db.get_user_points(user_id)
+        await ctx.send(f"{ctx.author.mention}, you have {points} points.")
+
+    @commands.command(name='leaderboard', help="!leaderboard \nShow the top 20 players with the most points")
+    async def leaderboard(self, ctx):
+        # Display the top 10 players on the leaderboard
+        sorted_users = self.db.get_top_users()
+        leaderboard_message = "Leaderboard:\n"
+        for idx, (user_id, points) in enumerate(sorted_users, start=1):
+            member = ctx.guild.get_member(int(user_id))
+            username = member.name if member else f"User not found ({user_id})"
+            leaderboard_message += f"{idx}. {username}: {points} points\n"
+
+        await ctx.send(leaderboard_message)
+
+    @commands.command(name='daily', help=f"!daily \nClaim {DAILY_CLAIM_POINTS} free points once a day (resets at midnight UTC)")
+    async def daily(self, ctx):
+        try:
+            user_id = ctx.author.id
+            day = today()
+
+            # Start a new claim set when the day changes, older claims are no longer needed
+            if day != self.claim_day:
+                self.db.prune_daily_claims(day)
+                self.claimed_today = self.db.get_daily_claims(day)
+                self.claim_day = day
+
+            # Already claimed today, answered from memory without touching the database
+            if user_id in self.claimed_today:
+                await ctx.send(f"{ctx.author.mention}, you already claimed your daily points. Come back tomorrow!")
+                return
+
+            claimed = self.db.claim_daily(user_id, day, DAILY_CLAIM_POINTS)
+            self.claimed_today.add(user_id)
+
+            if claimed:
+                await ctx.send(f"{ctx.author.mention}, you claimed {DAILY_CLAIM_POINTS} points!")
+            else:
+                await ctx.send(f"{ctx.author.mention}, you already claimed your daily points. Come back tomorrow!")
+        except Exception as e:
+            await ctx.send(f"An error occurred: {e}")
+
+    @tasks.loop(time=datetime.time(0, 0, tzinfo=datetime.timezone.utc))
+    async def daily_stipend(self):
+        # One transaction per guild for the members that already have points. The database
+        # records who was paid today, so users in guilds of other shard processes are paid once.
+        day = today()
+        granted_users = set()
+        for guild in self.bot.guilds:
+            member_ids = {member.id for member in guild.members if not member.bot} - granted_users
+            if member_ids:
+                granted = self.db.grant_stipend(member_ids, day, DAILY_STIPEND)
+                print(f"Daily stipend of {DAILY_STIPEND} points given to {granted} users in {guild.name}")
+            granted_users |= member_ids
+
+    @daily_stipend.before_loop
+    async def before_daily_stipend(self):
+        await self.bot.wait_until_ready()
+
+async def setup(bot):
+    # The database is owned by the bot and injected into the cog
+    await bot.add_cog(Points(bot, bot.db))
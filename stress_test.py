@@ -0,0 +1,85 @@
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import DiscordDB
+
+# Several processes hammer one shared database the way shard processes do, then the
+# balances are checked for lost updates.
+# Usage: python stress_test.py [--processes 1 2 4 8] [--operations 2000] [--users 50] [--writes 0.2]
+def worker(db_name, operations, users, writes, seed, results):
+    db = DiscordDB.DiscordDatabase(db_name)
+    rng = random.Random(seed)
+    added = 0
+    retries = 0
+
+    for _ in range(operations):
+        user_id = rng.randrange(users)
+        while True:
+            try:
+                if rng.random() < writes:
+                    db.update_user_points(user_id, 1)
+                    added += 1
+                else:
+                    # Drop the cached balance so every read goes to the database
+                    db.invalidate('points', user_id, publish=False)
+                    db.get_user_points(user_id)
+                break
+            except sqlite3.OperationalError:
+                # The lock wait is kept short on purpose, a busy database is retried by the caller
+                retries += 1
+
+    results.put((added, retries))
+
+def run(process_count, operations, users, writes):
+    with tempfile.TemporaryDirectory() as folder:
+        db_name = os.path.join(folder, 'stress.db')
+        db = DiscordDB.DiscordDatabase(db_name)
+        db.create_tables()
+        for user_id in range(users):
+            db.get_user_points(user_id)
+
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=worker, args=(db_name, operations, users, writes, seed, results))
+                     for seed in range(process_count)]
+
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        outcomes = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        added = sum(outcome[0] for outcome in outcomes)
+        retries = sum(outcome[1] for outcome in outcomes)
+
+        # Every user started with 100 points, anything missing is a lost update
+        conn = sqlite3.connect(db_name)
+        total = conn.execute('SELECT SUM(points) FROM user_points').fetchone()[0]
+        conn.close()
+        lost = users * 100 + added - total
+
+        return process_count * operations / elapsed, lost, retries
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-process stress test for DiscordDatabase")
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4, 8], help="Process counts to compare")
+    parser.add_argument('--operations', type=int, default=2000, help="Operations per process")
+    parser.add_argument('--users', type=int, default=50, help="Number of distinct users")
+    parser.add_argument('--writes', type=float, default=0.2, help="Fraction of operations that change a balance")
+    args = parser.parse_args()
+
+    print(f"{args.operations} operations per process, {args.writes:.0%} writes, {args.users} users")
+    print("processes | ops/s    | speedup | lost updates | lock retries")
+    baseline = None
+    for process_count in args.processes:
+        throughput, lost, retries = run(process_count, args.operations, args.users, args.writes)
+        baseline = baseline or throughput
+        print(f"{process_count:9} | {throughput:8.0f} | {throughput / baseline:6.2f}x | {lost:12} | {retries}")
+
+if __name__ == '__main__':
+    main()